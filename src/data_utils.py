@@ -1,24 +1,39 @@
 import os
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-import oandapyV20
+import numpy as np
 import pandas as pd
-from dotenv import load_dotenv
-from oandapyV20.endpoints.accounts import AccountInstruments
-from oandapyV20.endpoints.instruments import InstrumentsCandles
+
+# Candle cache lives in <repo>/data regardless of the working directory
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 
 # --- OANDA Client Setup ---
 
+# oandapyV20 and dotenv are imported inside the functions that talk to OANDA,
+# so the metrics helpers below can be used without paying for those imports
+
+# (client, account_id) built on first use and reused by later calls
+_CLIENT_CACHE = None
+
 
 def get_oanda_client():
     """
     Loads environment variables and initializes the OANDA API client.
+    The client is built once and cached for subsequent calls.
 
     Returns:
         oandapyV20.API: The initialized client object.
         str: The account ID.
     """
+    global _CLIENT_CACHE
+    if _CLIENT_CACHE is not None:
+        return _CLIENT_CACHE
+
+    import oandapyV20
+    from dotenv import load_dotenv
+
     # Load .env file (if not loaded globally)
     load_dotenv()
 
@@ -31,7 +46,8 @@ def get_oanda_client():
         )
 
     client = oandapyV20.API(access_token=api_key)
-    return client, account_id
+    _CLIENT_CACHE = (client, account_id)
+    return _CLIENT_CACHE
 
 
 def print_acceptable_instruments():
@@ -39,6 +55,8 @@ def print_acceptable_instruments():
     Connects to OANDA and prints all available trading instruments
     for the configured account.
     """
+    from oandapyV20.endpoints.accounts import AccountInstruments
+
     client, account_id = get_oanda_client()
 
     # Define the endpoint request
@@ -65,6 +83,183 @@ def print_acceptable_instruments():
         print(f"Error fetching instruments: {e}")
 
 
+# --- Candle Pagination ---
+
+# OANDA caps a single candles request at 5000 bars
+MAX_CANDLES_PER_REQUEST = 5000
+MAX_WORKERS = 10
+
+_GRANULARITY_UNITS = {"S": "s", "M": "min", "H": "h"}
+
+
+def _utc(value):
+    """
+    Converts a date-like value to a UTC Timestamp, localizing naive input
+    and converting tz-aware input.
+    """
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def _granularity_to_timedelta(granularity: str):
+    """
+    Converts an OANDA granularity code (e.g. 'M15', 'H4', 'D') to a bar duration.
+
+    Returns:
+        pd.Timedelta: The bar duration, or None if it is not fixed ('W', 'M').
+    """
+    if granularity == "D":
+        return pd.Timedelta(days=1)
+
+    unit = _GRANULARITY_UNITS.get(granularity[:1])
+    if unit is None or not granularity[1:].isdigit():
+        return None
+
+    return pd.Timedelta(int(granularity[1:]), unit=unit)
+
+
+def _request_candles(client, instrument, params):
+    """
+    Requests one page of candles and decodes the raw JSON body straight into
+    Arrow columns, bypassing the per-candle dicts client.request() would build.
+
+    Returns:
+        pa.Table: Complete candles with UTC datetime, float OHLC and int volume.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from oandapyV20.endpoints.instruments import InstrumentsCandles
+    from oandapyV20.exceptions import V20Error
+    from oandapyV20.oandapyV20 import TRADING_ENVIRONMENTS
+    from pyarrow import json as pa_json
+
+    # Same URL, session (auth headers) and extra request params as client.request
+    r = InstrumentsCandles(instrument=instrument, params=params)
+    url = f"{TRADING_ENVIRONMENTS[client.environment]['api']}/{r}"
+    response = client.client.get(url, params=params, **client.request_params)
+    if response.status_code >= 400:
+        raise V20Error(response.status_code, response.text)
+
+    candle_type = pa.struct(
+        [
+            ("complete", pa.bool_()),
+            ("volume", pa.int64()),
+            ("time", pa.string()),
+            ("mid", pa.struct([(k, pa.string()) for k in "ohlc"])),
+        ]
+    )
+    parse_options = pa_json.ParseOptions(
+        explicit_schema=pa.schema([("candles", pa.list_(candle_type))]),
+        unexpected_field_behavior="ignore",
+    )
+
+    # read_json expects one document per line; newlines can only appear as
+    # whitespace between JSON tokens, so flattening them is safe
+    body = pa_json.read_json(
+        pa.BufferReader(response.content.replace(b"\n", b" ")),
+        parse_options=parse_options,
+    )
+    candles = pa.Table.from_struct_array(
+        pa.concat_arrays([chunk.flatten() for chunk in body["candles"].chunks])
+    ).flatten()
+    candles = candles.filter(pc.fill_null(candles["complete"], True))
+
+    return pa.table(
+        {
+            "datetime": pc.cast(candles["time"], pa.timestamp("ns", tz="UTC")),
+            "open": pc.cast(candles["mid.o"], pa.float64()),
+            "high": pc.cast(candles["mid.h"], pa.float64()),
+            "low": pc.cast(candles["mid.l"], pa.float64()),
+            "close": pc.cast(candles["mid.c"], pa.float64()),
+            "volume": candles["volume"],
+        }
+    )
+
+
+def _candle_tables_to_frame(tables):
+    """
+    Concatenates per-page candle tables and converts them to pandas once.
+
+    Returns:
+        pd.DataFrame: Float OHLC and int volume, indexed by UTC datetime.
+    """
+    if not tables:
+        return pd.DataFrame()
+
+    import pyarrow as pa
+
+    df = (
+        pa.concat_tables(tables)
+        .to_pandas(split_blocks=True, self_destruct=True)
+        .set_index("datetime")
+    )
+
+    # Adjacent pages can share a boundary bar
+    return df[~df.index.duplicated(keep="first")]
+
+
+def _fetch_window(client, instrument, granularity, window_start, window_end):
+    """
+    Requests the candles falling between window_start and window_end.
+    """
+    params = {
+        "granularity": granularity,
+        "from": window_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "to": window_end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    return _request_candles(client, instrument, params)
+
+
+def _fetch_candles_concurrently(
+    client, instrument, granularity, start_dt, end_dt, bar, max_workers=MAX_WORKERS
+):
+    """
+    Fetches a known date range by splitting it into fixed-size windows up front
+    and requesting them in parallel, rather than chaining one request per page.
+
+    Args:
+        bar (pd.Timedelta): The bar duration for the granularity.
+        max_workers (int): The maximum number of requests in flight.
+
+    Returns:
+        list: Candle tables of the successful windows, in timestamp order.
+        bool: Whether every window was fetched successfully.
+    """
+    # One bar short of the cap so an inclusive 'to' can never exceed it
+    stride = bar * (MAX_CANDLES_PER_REQUEST - 1)
+
+    # OANDA rejects a 'to' in the future, so stop the last window at now
+    fetch_end = min(end_dt, pd.Timestamp.now("UTC"))
+
+    windows = []
+    window_start = start_dt
+    while window_start < fetch_end:
+        window_end = min(window_start + stride, fetch_end)
+        windows.append((window_start, window_end))
+        window_start = window_end
+
+    print(f"Requesting {len(windows)} pages with up to {max_workers} workers.")
+    req_start = time.time()
+
+    def fetch(window):
+        # A failed window is reported and skipped rather than discarding
+        # every other page along with it
+        try:
+            return _fetch_window(client, instrument, granularity, *window)
+        except Exception as e:
+            print(f"Request failed for window FROM {window[0]}: {e}")
+            return None
+
+    # Pages come back in window order
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pages = list(pool.map(fetch, windows))
+
+    print(f"Responses received in {time.time() - req_start:.3f}s.")
+
+    tables = [page for page in pages if page is not None]
+    return tables, len(tables) == len(pages)
+
+
 def fetch_instrument_candles(
     instrument: str, granularity: str, start: None, end=None, count: int = 5000
 ) -> pd.DataFrame:
@@ -76,20 +271,35 @@ def fetch_instrument_candles(
         granularity (str): The candle duration (e.g., 'M15', 'H4', 'D').
         count (int): The number of candles to retrieve (max 5000 per request).
 
+    Fully fetched ranges with an explicit end in the past are cached as
+    Parquet under DATA_DIR, keyed by instrument, granularity and date range;
+    a cached range is read back without contacting OANDA.
+
+    For fixed-duration granularities the whole range is requested concurrently;
+    weekly and monthly candles fall back to sequential pagination.
+
     Returns:
         pd.DataFrame: A DataFrame of historical prices, or None on failure.
     """
-    client, _ = get_oanda_client()
-
     try:
-        # Handle missing start/end defaults
-        if start is None:
-            start = datetime.utcnow() - timedelta(days=7)
-        if end is None:
-            end = datetime.utcnow()
+        # Handle missing start/end defaults (the last 7 days)
+        end_dt = pd.Timestamp.now("UTC") if end is None else _utc(end)
+        start_dt = end_dt - pd.Timedelta(days=7) if start is None else _utc(start)
+
+        # Key on the full timestamps so ranges within the same days don't collide
+        save_path = DATA_DIR / (
+            f"{instrument}_{granularity}_"
+            f"{start_dt.strftime('%Y%m%dT%H%M%S')}_{end_dt.strftime('%Y%m%dT%H%M%S')}"
+            ".parquet"
+        )
 
-        start_dt = pd.to_datetime(start).tz_localize("UTC")
-        end_dt = pd.to_datetime(end).tz_localize("UTC")
+        # Open-ended ranges are never written, so there is nothing to look up
+        if end is not None and save_path.exists():
+            df = pd.read_parquet(save_path)
+            print(f"Loaded {len(df)} cached candles from {save_path}")
+            return df
+
+        client, _ = get_oanda_client()
 
         # # Parameters for the API request
         # params = {
@@ -97,93 +307,92 @@ def fetch_instrument_candles(
         #     "count": count
         # }
 
-        all_candles = []
-        next_from = start_dt
-        iteration = 0
-
         # t0 = time.time()
 
-        save_path = (
-            f"../data/{instrument}_{granularity}_{start_dt.date()}_{end_dt.date()}.csv"
-        )
-
-        while next_from < end_dt:
-            iteration += 1
-            req_start = time.time()
-
-            print(f"[{iteration}] Requesting data FROM: {next_from}")
-
-            params = {
-                "granularity": granularity,
-                "from": next_from.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                "count": 5000,
-            }
-
-            try:
-                r = InstrumentsCandles(instrument=instrument, params=params)
-                data = client.request(r)
-            except Exception as e:
-                print(f"Request failed: {e}")
-                break
+        bar = _granularity_to_timedelta(granularity)
 
-            candles = data.get("candles", [])
-
-            req_time = time.time() - req_start
-            print(
-                f"[{iteration}] Response received in {req_time:.3f}s. "
-                f"Candles returned: {len(candles)}"
+        if bar is not None:
+            tables, complete = _fetch_candles_concurrently(
+                client, instrument, granularity, start_dt, end_dt, bar
             )
-
-            if not candles:
-                print(f"[{iteration}] No candles returned. Stopping.")
-                break
-
-            parsed = [
-                {
-                    "datetime": candle["time"],
-                    "open": float(candle["mid"]["o"]),
-                    "high": float(candle["mid"]["h"]),
-                    "low": float(candle["mid"]["l"]),
-                    "close": float(candle["mid"]["c"]),
-                    "volume": candle["volume"],
+        else:
+            tables = []
+            complete = True
+            next_from = start_dt
+            prev_last_ts = None
+            iteration = 0
+
+            while next_from < end_dt:
+                iteration += 1
+                req_start = time.time()
+
+                print(f"[{iteration}] Requesting data FROM: {next_from}")
+
+                params = {
+                    "granularity": granularity,
+                    "from": next_from.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "count": MAX_CANDLES_PER_REQUEST,
                 }
-                for candle in candles
-                if candle.get("complete", True)
-            ]
 
-            all_candles.extend(parsed)
+                try:
+                    page = _request_candles(client, instrument, params)
+                except Exception as e:
+                    print(f"Request failed: {e}")
+                    complete = False
+                    break
 
-            last_ts = pd.to_datetime(parsed[-1]["datetime"])
-            print(f"[{iteration}] Last candle timestamp: {last_ts}")
-
-            # --- FIX: Detect if the timestamp did not advance ---
-            if len(all_candles) > 1 and last_ts <= pd.to_datetime(
-                all_candles[-2]["datetime"]
-            ):
+                req_time = time.time() - req_start
                 print(
-                    "Detected timestamp stall. Stopping loop to avoid infinite requests."
+                    f"[{iteration}] Response received in {req_time:.3f}s. "
+                    f"Candles returned: {page.num_rows}"
                 )
-                break
 
-            next_from = last_ts + pd.Timedelta(milliseconds=1)
+                if not page.num_rows:
+                    print(f"[{iteration}] No candles returned. Stopping.")
+                    break
+
+                tables.append(page)
+
+                last_ts = pd.Timestamp(page["datetime"][-1].value, tz="UTC")
+                print(f"[{iteration}] Last candle timestamp: {last_ts}")
+
+                # --- FIX: Detect if the timestamp did not advance ---
+                # Compare against the previous page's last candle, which was
+                # already parsed on the prior iteration
+                if prev_last_ts is not None and last_ts <= prev_last_ts:
+                    print(
+                        "Detected timestamp stall. Stopping loop to avoid infinite requests."
+                    )
+                    complete = False
+                    break
+
+                prev_last_ts = last_ts
+                next_from = last_ts + pd.Timedelta(milliseconds=1)
 
-            if next_from >= end_dt:
-                print(f"[{iteration}] Reached END date, stopping loop.")
-                break
+                if next_from >= end_dt:
+                    print(f"[{iteration}] Reached END date, stopping loop.")
+                    break
 
         # Create DataFrame
-        df = pd.DataFrame(all_candles)
+        df = _candle_tables_to_frame(tables)
+
+        # Sequential pages run past the end; trim so both paths return the
+        # same range and a cached file matches its key
+        df = df[df.index <= end_dt] if not df.empty else df
         if df.empty:
             print("No data returned. Exiting.")
             return df
 
-        # Clean up and format the DataFrame
-        df["datetime"] = pd.to_datetime(df["datetime"])
-        df = df.set_index("datetime")
-
-        # TO DO????
-        df.to_csv(save_path)
-        print(f"Saved {len(df)} candles to {save_path}")
+        # Only cache ranges that were fully fetched and can no longer change:
+        # an explicit end whose last bar has closed (weekly/monthly bars have
+        # no fixed length, so allow for the longest)
+        settled_at = end_dt + (bar if bar is not None else pd.Timedelta(days=31))
+        if complete and end is not None and settled_at <= pd.Timestamp.now("UTC"):
+            DATA_DIR.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(save_path, engine="pyarrow", compression="zstd")
+            print(f"Saved {len(df)} candles to {save_path}")
+        else:
+            print("Range is incomplete or still open; not caching.")
 
         print(
             f"Successfully fetched {len(df)} candles for {instrument} at {granularity}."
@@ -195,14 +404,50 @@ def fetch_instrument_candles(
         return None
 
 
-import numpy as np
-import pandas as pd
+def _daily_returns(df, start_cash):
+    """
+    Sums pnl per calendar day of exit and converts it to returns on start_cash.
+    Days between the first and last exit with no trades get a 0 return.
 
+    Returns:
+        first_day (np.datetime64): Day of the first exit
+        daily_returns (np.ndarray): One return per day from first_day onwards
+    """
+    # --- Bucket pnl into integer day offsets from the first exit date ---
+    exit_time = pd.to_datetime(df["exit_time"])
+    if exit_time.dt.tz is not None:
+        # Floor on the local calendar day rather than the UTC one
+        exit_time = exit_time.dt.tz_localize(None)
+    exit_days = exit_time.values.astype("datetime64[D]")
+    first_day = exit_days.min()
+    day_idx = (exit_days - first_day).astype(np.int64)
 
-def compute_sharpe_metrics(df, start_cash, risk_free_rate=0.0004):
+    # Days without exits get 0 pnl, so no reindex/fillna is needed
+    daily_pnl = np.bincount(day_idx, weights=df["pnl"].to_numpy(dtype=np.float64))
+
+    return first_day, daily_pnl / start_cash
+
+
+def _sharpe_from_returns(daily_returns, risk_free_rate):
     """
-    Computes daily returns, fills missing dates, and calculates annualised
-    volatility and Sharpe ratio.
+    Computes annualised volatility, annualised Sharpe ratio and mean daily
+    return, taking the mean and variance of the array once each.
+    """
+    mean_daily_return = daily_returns.mean()
+    daily_vol = np.sqrt(daily_returns.var(ddof=1))
+    annual_vol = daily_vol * np.sqrt(252)
+
+    daily_rf = risk_free_rate / 252
+    daily_sharpe = (mean_daily_return - daily_rf) / daily_vol
+    annual_sharpe = daily_sharpe * np.sqrt(252)
+
+    return annual_vol, annual_sharpe, mean_daily_return
+
+
+def compute_sharpe_metrics_fast(df, start_cash, risk_free_rate=0.0004):
+    """
+    Same metrics as compute_sharpe_metrics without building the daily
+    returns DataFrame, for use inside parameter sweeps.
 
     Parameters:
         df (pd.DataFrame): Must contain columns ['exit_time', 'pnl']
@@ -210,42 +455,39 @@ def compute_sharpe_metrics(df, start_cash, risk_free_rate=0.0004):
         risk_free_rate (float): Annual risk-free rate (default 0.0004)
 
     Returns:
-        daily_returns_complete (pd.DataFrame)
         annual_vol (float)
         annual_sharpe (float)
         mean_daily_return (float)
     """
+    _, daily_returns = _daily_returns(df, start_cash)
+    return _sharpe_from_returns(daily_returns, risk_free_rate)
 
-    # --- Convert exit_time to date and compute daily pnl ---
-    df["exit_date"] = pd.to_datetime(df["exit_time"]).dt.date
-    daily_pnl = df.groupby("exit_date")["pnl"].sum()
 
-    # Compute daily returns
-    daily_returns = daily_pnl / start_cash
-    daily_returns = pd.DataFrame(daily_returns)
-    daily_returns.columns = ["pnl"]  # ensure consistent naming
-
-    # --- Create full date range ---
-    start_date = daily_returns.index.min()
-    end_date = daily_returns.index.max()
-
-    full_date_range = pd.date_range(start=start_date, end=end_date, freq="D")
-
-    # --- Reindex + fill missing with 0 ---
-    daily_returns_reindexed = daily_returns.reindex(full_date_range)
-    daily_returns_complete = daily_returns_reindexed.fillna(0.0)
-
-    # Extract the series
-    daily_returns_series = daily_returns_complete["pnl"]
-
-    # --- Compute metrics ---
-    daily_vol = daily_returns_series.std()
-    annual_vol = daily_vol * np.sqrt(252)
+def compute_sharpe_metrics(df, start_cash, risk_free_rate=0.0004):
+    """
+    Computes daily returns, fills missing dates, and calculates annualised
+    volatility and Sharpe ratio.
 
-    daily_rf = risk_free_rate / 252
-    daily_sharpe = (daily_returns_series.mean() - daily_rf) / daily_vol
-    annual_sharpe = daily_sharpe * np.sqrt(252)
+    Parameters:
+        df (pd.DataFrame): Must contain columns ['exit_time', 'pnl']
+        start_cash (float): Initial capital
+        risk_free_rate (float): Annual risk-free rate (default 0.0004)
 
-    mean_daily_return = daily_returns_series.mean()
+    Returns:
+        daily_returns_complete (pd.DataFrame)
+        annual_vol (float)
+        annual_sharpe (float)
+        mean_daily_return (float)
+    """
+    first_day, daily_returns = _daily_returns(df, start_cash)
+    annual_vol, annual_sharpe, mean_daily_return = _sharpe_from_returns(
+        daily_returns, risk_free_rate
+    )
+
+    # --- Attach the full date range ---
+    full_date_range = pd.date_range(
+        start=first_day, periods=len(daily_returns), freq="D"
+    )
+    daily_returns_complete = pd.DataFrame({"pnl": daily_returns}, index=full_date_range)
 
     return daily_returns_complete, annual_vol, annual_sharpe, mean_daily_return
@@ -0,0 +1,158 @@
+import numpy as np
+from numba import njit, prange
+
+
+# =============================================================
+# RSI (WILDER SMOOTHING)
+# =============================================================
+@njit(cache=True)
+def wilder_rsi(close, period):
+    """
+    Computes the RSI with Wilder's smoothing, matching bt.indicators.RSI.
+
+    Returns an array the length of close, NaN for the first `period` bars.
+    """
+    n = len(close)
+    rsi = np.full(n, np.nan)
+    if n <= period:
+        return rsi
+
+    # Seed the averages with a simple mean of the first `period` moves
+    avg_up = 0.0
+    avg_down = 0.0
+    for i in range(1, period + 1):
+        change = close[i] - close[i - 1]
+        if change > 0:
+            avg_up += change
+        else:
+            avg_down -= change
+    avg_up /= period
+    avg_down /= period
+
+    for i in range(period, n):
+        if i > period:
+            change = close[i] - close[i - 1]
+            avg_up = (avg_up * (period - 1) + max(change, 0.0)) / period
+            avg_down = (avg_down * (period - 1) + max(-change, 0.0)) / period
+
+        if avg_down == 0.0:
+            rsi[i] = 100.0
+        else:
+            rsi[i] = 100.0 - 100.0 / (1.0 + avg_up / avg_down)
+
+    return rsi
+
+
+# =============================================================
+# MULTI-ORDER RSI TRADES
+# =============================================================
+@njit(cache=True)
+def multirsi_trades(close, rsi, buy_rsi, sell_rsi, exit_buy_rsi, exit_sell_rsi):
+    """
+    Replays the MultiOrderRSI entry/exit rules over whole arrays.
+
+    Returns one row per opened position: entry bar, exit bar (-1 while still
+    open) and whether it is a short.
+    """
+    n = len(close)
+    # At most one long and one short open per bar
+    capacity = 2 * n
+    entry_idx = np.empty(capacity, dtype=np.int64)
+    exit_idx = np.full(capacity, -1, dtype=np.int64)
+    is_short = np.empty(capacity, dtype=np.bool_)
+
+    # Stack of trade ids that are still open
+    open_idx = np.empty(capacity, dtype=np.int64)
+    open_len = 0
+    n_trades = 0
+
+    for i in range(n):
+        r = rsi[i]
+
+        if r < buy_rsi:
+            entry_idx[n_trades] = i
+            is_short[n_trades] = False
+            open_idx[open_len] = n_trades
+            open_len += 1
+            n_trades += 1
+
+        if r > sell_rsi:
+            entry_idx[n_trades] = i
+            is_short[n_trades] = True
+            open_idx[open_len] = n_trades
+            open_len += 1
+            n_trades += 1
+
+        # Walk backwards so a closed slot can be refilled from the
+        # (already checked) tail without shifting the rest
+        j = open_len - 1
+        while j >= 0:
+            t = open_idx[j]
+            if (not is_short[t] and r > exit_buy_rsi) or (
+                is_short[t] and r < exit_sell_rsi
+            ):
+                exit_idx[t] = i
+                open_len -= 1
+                open_idx[j] = open_idx[open_len]
+            j -= 1
+
+    return entry_idx[:n_trades], exit_idx[:n_trades], is_short[:n_trades]
+
+
+@njit(cache=True)
+def backtest_multiorder_rsi(close, period, buy_rsi, sell_rsi, exit_buy, exit_sell):
+    """
+    Backtests the MultiOrderRSI rules on raw close prices without Backtrader.
+    Intended for parameter sweeps; use MultiOrderRSI to validate the final
+    parameters with full order handling.
+
+    Returns the closed trades in entry order: entry bar, exit bar, whether
+    each is a short, and its pnl per unit.
+    """
+    rsi = wilder_rsi(close, period)
+    entry_idx, exit_idx, is_short = multirsi_trades(
+        close, rsi, buy_rsi, sell_rsi, exit_buy, exit_sell
+    )
+
+    closed = exit_idx >= 0
+    entry_idx = entry_idx[closed]
+    exit_idx = exit_idx[closed]
+    is_short = is_short[closed]
+
+    pnl = close[exit_idx] - close[entry_idx]
+    pnl[is_short] = -pnl[is_short]
+
+    return entry_idx, exit_idx, is_short, pnl
+
+
+@njit(cache=True, parallel=True)
+def sweep_multiorder_rsi(close, params):
+    """
+    Runs backtest_multiorder_rsi for every parameter row in parallel.
+
+    Parameters:
+        close (np.ndarray): Close prices per bar
+        params (np.ndarray): One row per combination with columns
+            (period, buy_rsi, sell_rsi, exit_buy, exit_sell)
+
+    Returns:
+        total_pnl (np.ndarray): Summed pnl per combination
+        n_trades (np.ndarray): Number of closed trades per combination
+    """
+    n_combos = params.shape[0]
+    total_pnl = np.empty(n_combos)
+    n_trades = np.empty(n_combos, dtype=np.int64)
+
+    for k in prange(n_combos):
+        _, _, _, pnl = backtest_multiorder_rsi(
+            close,
+            int(params[k, 0]),
+            params[k, 1],
+            params[k, 2],
+            params[k, 3],
+            params[k, 4],
+        )
+        total_pnl[k] = pnl.sum()
+        n_trades[k] = len(pnl)
+
+    return total_pnl, n_trades
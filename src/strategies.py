@@ -1,6 +1,24 @@
 import backtrader as bt
+import numpy as np
 import pandas as pd
 
+from .fast_backtest import multirsi_trades
+
+# Backtrader date number (days since 0001-01-01, plus one) of 1970-01-01
+UNIX_EPOCH_DATENUM = 719163.0
+
+
+def _datenums_to_datetimes(nums, tz=None):
+    """
+    Converts an array of Backtrader date numbers (UTC) to naive datetimes,
+    expressed in tz when given, as data.datetime.datetime() does.
+    """
+    # Round away float noise in the date number's fractional day
+    times = pd.to_datetime(nums - UNIX_EPOCH_DATENUM, unit="D").round("ms")
+    if tz is not None:
+        times = times.tz_localize("UTC").tz_convert(tz).tz_localize(None)
+    return times
+
 
 # =============================================================
 # MULTI-ORDER RSI STRATEGY
@@ -17,78 +35,154 @@ class MultiOrderRSI(bt.Strategy):
     def __init__(self):
         self.rsi = bt.indicators.RSI(self.data.close, period=self.p.rsi_period)
         # Track trades manually
-        self.open_positions = []  # list of dicts for open trades
+        # Open trades are stored column-wise; only the first _n_open
+        # slots of each array are live
+        self._n_open = 0
+        self._pos_short = np.empty(64, dtype=np.bool_)
+        self._pos_entry_rsi = np.empty(64, dtype=np.float64)
+        self._pos_entry_price = np.empty(64, dtype=np.float64)
+        self._pos_entry_time = np.empty(64, dtype=np.float64)  # date numbers
+        self._pos_order = np.empty(64, dtype=object)
         self.closed_positions = []  # completed trades
 
+    @property
+    def open_positions(self):
+        """Open trades as a list of dicts, in entry order."""
+        n = self._n_open
+        entry_times = _datenums_to_datetimes(self._pos_entry_time[:n], tz=self.data._tz)
+        return [
+            {
+                "type": "short" if self._pos_short[i] else "long",
+                "entry_rsi": float(self._pos_entry_rsi[i]),
+                "entry_price": float(self._pos_entry_price[i]),
+                "entry_time": entry_times[i],
+                "order_ref": self._pos_order[i],
+            }
+            for i in range(n)
+        ]
+
+    def _open_position(self, is_short, rsi, price, now, order):
+        n = self._n_open
+        if n == len(self._pos_short):
+            # Double the capacity of every column
+            (
+                self._pos_short,
+                self._pos_entry_rsi,
+                self._pos_entry_price,
+                self._pos_entry_time,
+                self._pos_order,
+            ) = (
+                np.concatenate((a, np.empty_like(a)))
+                for a in (
+                    self._pos_short,
+                    self._pos_entry_rsi,
+                    self._pos_entry_price,
+                    self._pos_entry_time,
+                    self._pos_order,
+                )
+            )
+
+        self._pos_short[n] = is_short
+        self._pos_entry_rsi[n] = rsi
+        self._pos_entry_price[n] = price
+        self._pos_entry_time[n] = now
+        self._pos_order[n] = order
+        self._n_open = n + 1
+
     # ---------------------------------------------------------
     # MAIN LOGIC: ENTRY & EXIT
     # ---------------------------------------------------------
     def next(self):
         rsi = self.rsi[0]
         price = self.data.close[0]
-        now = self.data.datetime.datetime(0)
+        # Raw Backtrader date number; converted to datetimes in stop()
+        now = self.data.datetime[0]
 
         # --------------------------
         # 1. OPEN BUY ORDERS BELOW BUY RSI
         # --------------------------
         if rsi < self.p.buy_rsi:
             order = self.buy()
-            self.open_positions.append(
-                {
-                    "type": "long",
-                    "entry_rsi": rsi,
-                    "entry_price": price,
-                    "entry_time": now,
-                    "order_ref": order,
-                }
-            )
+            self._open_position(False, rsi, price, now, order)
 
         # --------------------------
         # 2. OPEN SELL ORDERS ABOVE SELL RSI
         # --------------------------
         if rsi > self.p.sell_rsi:
             order = self.sell()
-            self.open_positions.append(
-                {
-                    "type": "short",
-                    "entry_rsi": rsi,
-                    "entry_price": price,
-                    "entry_time": now,
-                    "order_ref": order,
-                }
-            )
+            self._open_position(True, rsi, price, now, order)
 
         # --------------------------
         # 3. CHECK EXIT CONDITIONS
         # --------------------------
-        positions_to_close = []
+        n = self._n_open
+        short = self._pos_short[:n]
 
-        for pos in self.open_positions:
-            # Close long trades when RSI exceeds exit_buy_rsi
-            if pos["type"] == "long" and rsi > self.p.exit_buy_rsi:
-                order = self.sell()
-                positions_to_close.append((pos, order))
-
-            # Close short trades when RSI drops below exit_sell_rsi
-            if pos["type"] == "short" and rsi < self.p.exit_sell_rsi:
-                order = self.buy()
-                positions_to_close.append((pos, order))
+        # Close long trades when RSI exceeds exit_buy_rsi and
+        # short trades when RSI drops below exit_sell_rsi
+        closing = (~short & (rsi > self.p.exit_buy_rsi)) | (
+            short & (rsi < self.p.exit_sell_rsi)
+        )
+        closing_idx = np.flatnonzero(closing)
+        if not len(closing_idx):
+            return
 
         # Move closed trades to closed_positions
-        for pos, order in positions_to_close:
-            pos["exit_order"] = order
-            pos["exit_rsi"] = rsi
-            pos["exit_time"] = now
-            pos["exit_price"] = price
-
-            # Calculate PnL
-            if pos["type"] == "long":
-                pos["pnl"] = pos["exit_price"] - pos["entry_price"]
+        for i in closing_idx:
+            entry_price = float(self._pos_entry_price[i])
+
+            if short[i]:
+                order = self.buy()
+                pnl = entry_price - price
             else:
-                pos["pnl"] = pos["entry_price"] - pos["exit_price"]
+                order = self.sell()
+                pnl = price - entry_price
+
+            self.closed_positions.append(
+                {
+                    "type": "short" if short[i] else "long",
+                    "entry_rsi": float(self._pos_entry_rsi[i]),
+                    "entry_price": entry_price,
+                    "entry_time": float(self._pos_entry_time[i]),
+                    "order_ref": self._pos_order[i],
+                    "exit_order": order,
+                    "exit_rsi": rsi,
+                    "exit_time": now,
+                    "exit_price": price,
+                    "pnl": pnl,
+                }
+            )
 
-            self.closed_positions.append(pos)
-            self.open_positions.remove(pos)
+        # Shift the remaining open trades to the front, keeping entry order
+        keep = ~closing
+        n_keep = n - len(closing_idx)
+        for a in (
+            self._pos_short,
+            self._pos_entry_rsi,
+            self._pos_entry_price,
+            self._pos_entry_time,
+            self._pos_order,
+        ):
+            a[:n_keep] = a[:n][keep]
+        self._pos_order[n_keep:n] = None
+        self._n_open = n_keep
+
+    # ---------------------------------------------------------
+    # END OF BACKTEST: CONVERT TIMESTAMPS
+    # ---------------------------------------------------------
+    def stop(self):
+        if not self.closed_positions:
+            return
+
+        for key in ("entry_time", "exit_time"):
+            times = _datenums_to_datetimes(
+                np.fromiter(
+                    (pos[key] for pos in self.closed_positions), dtype=np.float64
+                ),
+                tz=self.data._tz,
+            )
+            for pos, t in zip(self.closed_positions, times):
+                pos[key] = t
 
     # ---------------------------------------------------------
     # ORDER NOTIFICATION
@@ -109,3 +203,71 @@ class MultiOrderRSI(bt.Strategy):
 
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
             print("Order Canceled/Margin/Rejected")
+
+
+# =============================================================
+# JIT MULTI-ORDER RSI (NO BACKTRADER EVENT LOOP)
+# =============================================================
+def run_multirsi(
+    close,
+    rsi,
+    times=None,
+    buy_rsi=30,
+    sell_rsi=70,
+    exit_buy_rsi=70,
+    exit_sell_rsi=30,
+):
+    """
+    Runs the MultiOrderRSI rules outside Backtrader in a single JIT pass.
+
+    Parameters:
+        close (array-like): Close prices per bar
+        rsi (array-like): RSI per bar (NaN during warm-up is ignored)
+        times (array-like): Optional bar timestamps, defaults to bar numbers
+        buy_rsi, sell_rsi, exit_buy_rsi, exit_sell_rsi: As in MultiOrderRSI
+
+    Returns:
+        pd.DataFrame: Closed positions in the same order as
+        MultiOrderRSI.closed_positions, with the same price/RSI/time/pnl
+        columns (no order objects)
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    rsi = np.ascontiguousarray(rsi, dtype=np.float64)
+
+    entry_idx, exit_idx, is_short = multirsi_trades(
+        close, rsi, buy_rsi, sell_rsi, exit_buy_rsi, exit_sell_rsi
+    )
+
+    # Keep closed trades, ordered by exit bar then entry order
+    closed = exit_idx >= 0
+    entry_idx, exit_idx, is_short = (
+        entry_idx[closed],
+        exit_idx[closed],
+        is_short[closed],
+    )
+    order = np.lexsort((is_short, entry_idx, exit_idx))
+    entry_idx, exit_idx, is_short = entry_idx[order], exit_idx[order], is_short[order]
+
+    entry_price = close[entry_idx]
+    exit_price = close[exit_idx]
+
+    if times is None:
+        entry_time, exit_time = entry_idx, exit_idx
+    else:
+        times = pd.Index(times)
+        entry_time, exit_time = times.take(entry_idx), times.take(exit_idx)
+
+    return pd.DataFrame(
+        {
+            "type": np.where(is_short, "short", "long"),
+            "entry_rsi": rsi[entry_idx],
+            "entry_price": entry_price,
+            "entry_time": entry_time,
+            "exit_rsi": rsi[exit_idx],
+            "exit_time": exit_time,
+            "exit_price": exit_price,
+            "pnl": np.where(
+                is_short, entry_price - exit_price, exit_price - entry_price
+            ),
+        }
+    )